@@ -1,12 +1,17 @@
-import json
-from typing import Any
+from __future__ import annotations
 
+import asyncio
+import os
+from typing import TYPE_CHECKING, Any
+
+import orjson
 import typer
-from openai import Client
-from openai.types.responses import Response
 
 from ai_assistant.commands import make_typer
-from ai_assistant.settings import OpenAISettings
+from ai_assistant.settings import get_openai_settings
+
+if TYPE_CHECKING:
+    from openai.types.responses import Response
 
 helptext = """
 基于 OpenAI Responses API 的 mcp-mcd 工具
@@ -28,6 +33,7 @@ class McdMcpOpenAIResponsesAgent:
         mcp_url: str = MCP_URL,
         auto_approve: bool = True,
         verbose: bool = True,
+        stream: bool = False,
     ):
         """
         初始化 Agent
@@ -40,13 +46,25 @@ class McdMcpOpenAIResponsesAgent:
             mcp_url: MCP 服务的 URL
             auto_approve: 是否自动批准工具调用
             verbose: 是否打印详细信息
+            stream: 是否流式打印回复（降低首 token 等待）
         """
-        self.client = Client(base_url=base_url, api_key=api_key)
+        # openai/httpx 延迟到构造 Agent 时再导入, 保持 CLI 启动轻量
+        import httpx
+        from openai import AsyncOpenAI
+
+        # OPENAI_HTTP2=1 时换用带 HTTP/2 与重试的 httpx 传输层, 缓解高并发下的吞吐瓶颈
+        http_client: httpx.AsyncClient | None = None
+        if os.environ.get("OPENAI_HTTP2") == "1":
+            http_client = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(http2=True, retries=2))
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
         self.model = model
         self.mcp_token = mcp_token
         self.mcp_url = mcp_url
         self.auto_approve = auto_approve
         self.verbose = verbose
+        self.stream = stream
+        # 记录上一轮响应 id, 多轮对话时让服务端复用静态前缀的 KV 缓存
+        self._last_response_id: str | None = None
 
         # 定义 MCP 工具配置
         self.tools = [
@@ -62,14 +80,16 @@ class McdMcpOpenAIResponsesAgent:
             }
         ]
 
+    # 预生成常用分隔线, 每次打印不再重复构造字符串
+    _BARS = {"=": "=" * 60, "-": "-" * 60}
+
     def _print_separator(self, title: str = "", char: str = "=", length: int = 60):
-        """打印分隔线"""
+        """打印分隔线, 合并为一次输出减少 stdout 写入次数"""
+        bar = self._BARS[char] if length == 60 and char in self._BARS else char * length
         if title:
-            typer.echo(f"\n{char * length}")
-            typer.echo(f"{title}")
-            typer.echo(f"{char * length}")
+            typer.echo("\n".join([f"\n{bar}", title, bar]))
         else:
-            typer.echo(f"{char * length}")
+            typer.echo(bar)
 
     def _print_message(self, role: str, content: str):
         """打印消息"""
@@ -80,10 +100,12 @@ class McdMcpOpenAIResponsesAgent:
             typer.echo(content)
 
     def _print_tool_call(self, tool_name: str, arguments: dict[str, Any]):
-        """打印工具调用信息"""
+        """打印工具调用信息, 大参数只展示前 4KB"""
         if self.verbose:
             typer.echo(f"\n🔧 [工具调用] {tool_name}")
-            typer.echo(f"参数: {json.dumps(arguments, ensure_ascii=False, indent=2)}")
+            buf = orjson.dumps(arguments, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            suffix = "..." if len(buf) > 4096 else ""
+            typer.echo(f"参数: {buf[:4096].decode(errors='ignore')}{suffix}")
 
     def _print_response_info(self, response: Response):
         """打印响应信息"""
@@ -99,13 +121,15 @@ class McdMcpOpenAIResponsesAgent:
                 typer.echo(f"  - Output: {response.usage.output_tokens}")
                 typer.echo(f"  - Total: {response.usage.total_tokens}")
 
-    def run_conversation(self, user_query: str, system_prompt: str | None = None) -> str:
+    async def run_conversation(self, user_query: str, system_prompt: str | None = None, previous_response_id: str | None = None) -> str:
         """
         运行一次完整的对话流程
 
         Args:
             user_query: 用户的问题
             system_prompt: 系统提示词（可选）
+            previous_response_id: 要续接的上一轮响应 id, 由调用方显式传入;
+                并发场景传 None, 避免多个任务隐式串到同一条对话上
 
         Returns:
             助手的最终回复文本
@@ -123,11 +147,27 @@ class McdMcpOpenAIResponsesAgent:
         # 调用 responses API
         self._print_separator("开始调用 OpenAI Responses API")
 
-        response = self.client.responses.create(
-            model=self.model,
-            tools=self.tools,  # type: ignore
-            input=messages,  # type: ignore
-        )
+        if self.stream:
+            # 流式输出: 边生成边打印增量文本, 不等整个响应落地
+            async with self.client.responses.stream(
+                model=self.model,
+                tools=self.tools,  # type: ignore
+                input=messages,  # type: ignore
+                previous_response_id=previous_response_id,
+            ) as stream:
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        typer.echo(event.delta, nl=False)
+                typer.echo()
+                response = await stream.get_final_response()
+        else:
+            response = await self.client.responses.create(
+                model=self.model,
+                tools=self.tools,  # type: ignore
+                input=messages,  # type: ignore
+                previous_response_id=previous_response_id,
+            )
+        self._last_response_id = response.id
 
         # 打印响应信息
         self._print_response_info(response)
@@ -135,20 +175,20 @@ class McdMcpOpenAIResponsesAgent:
         # 提取输出文本
         output_text = response.output_text or ""
 
-        if output_text:
+        # 流式路径已逐段打印过, 不再整段重复输出
+        if output_text and not self.stream:
             self._print_message("assistant", output_text)
 
-        # 检查是否有工具调用
-        if hasattr(response, "output") and response.output:
+        # 检查是否有工具调用, 输出仅在 verbose 下使用, 非 verbose 时跳过整个扫描
+        if self.verbose and response.output:
             for item in response.output:
-                if item.type == "tool_use":
-                    tool_name = item.name
-                    tool_input = item.input if hasattr(item, "input") else {}
-                    self._print_tool_call(tool_name, tool_input)
+                if item.type != "tool_use":
+                    continue
+                self._print_tool_call(item.name, item.input)
 
         return output_text
 
-    def run_multi_turn_conversation(self, queries: list[str], system_prompt: str | None = None) -> list[str]:
+    async def run_multi_turn_conversation(self, queries: list[str], system_prompt: str | None = None) -> list[str]:
         """
         运行多轮对话
 
@@ -163,7 +203,8 @@ class McdMcpOpenAIResponsesAgent:
 
         for i, query in enumerate(queries, 1):
             self._print_separator(f"第 {i}/{len(queries)} 轮对话", "=", 60)
-            result = self.run_conversation(query, system_prompt if i == 1 else None)
+            # 每轮发送相同的 system 前缀, 保持前缀一致才能命中服务端 prompt 缓存
+            result = await self.run_conversation(query, system_prompt, previous_response_id=self._last_response_id)
             results.append(result)
 
         return results
@@ -178,11 +219,12 @@ def single(
     model: str | None = typer.Option(None, help="使用的模型名称", envvar="OPENAI_MODEL"),
     auto_approve: bool = typer.Option(True, help="是否自动批准工具调用"),
     verbose: bool = typer.Option(True, help="是否打印详细信息"),
+    stream: bool = typer.Option(False, "--stream", help="流式打印回复，降低首 token 等待"),
 ):
     """运行单次对话查询"""
 
     # 加载配置
-    settings = OpenAISettings()
+    settings = get_openai_settings()
     base_url = base_url or settings.base_url
     api_key = api_key or settings.api_key
     model = model or settings.model
@@ -205,6 +247,7 @@ def single(
         mcp_token=mcp_token,
         auto_approve=auto_approve,
         verbose=verbose,
+        stream=stream,
     )
 
     # 系统提示词
@@ -214,7 +257,7 @@ def single(
 
     # 运行对话
     try:
-        result = agent.run_conversation(query, system_prompt)
+        result = asyncio.run(agent.run_conversation(query, system_prompt))
 
         # 输出最终结果
         agent._print_separator("最终结果", "=", 60)
@@ -238,7 +281,7 @@ def quickstart(
     """运行预设的演示查询（多个场景）"""
 
     # 加载配置
-    settings = OpenAISettings()
+    settings = get_openai_settings()
     base_url = base_url or settings.base_url
     api_key = api_key or settings.api_key
     model = model or settings.model
@@ -281,17 +324,23 @@ def quickstart(
     typer.echo("🚀 开始运行 OpenAI Responses API Agent Demo")
     typer.echo("=" * 60)
 
-    for i, query in enumerate(demo_queries, 1):
-        try:
-            agent._print_separator(f"演示 {i}/{len(demo_queries)}: {query}", "=", 60)
-            result = agent.run_conversation(query, system_prompt if i == 1 else None)
-            results.append({"query": query, "result": result, "success": True})
+    async def run_demo_queries() -> list[str | BaseException]:
+        """并发执行所有演示查询, 整体耗时约等于最慢的一条而非各条之和"""
+        # 各演示是互不相关的独立对话, 显式传 None 禁用续接, 避免并发任务串到彼此的对话上
+        tasks = [agent.run_conversation(query, system_prompt, previous_response_id=None) for query in demo_queries]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    outcomes = asyncio.run(run_demo_queries())
+
+    for i, (query, outcome) in enumerate(zip(demo_queries, outcomes), 1):
+        if isinstance(outcome, BaseException):
+            typer.echo(f"\n❌ 演示 {i} 失败: {str(outcome)}", err=True)
+            results.append({"query": query, "result": str(outcome), "success": False})
+            fail_count += 1
+        else:
+            results.append({"query": query, "result": outcome, "success": True})
             success_count += 1
             typer.echo(f"\n✅ 演示 {i} 完成")
-        except Exception as e:
-            typer.echo(f"\n❌ 演示 {i} 失败: {str(e)}", err=True)
-            results.append({"query": query, "result": str(e), "success": False})
-            fail_count += 1
 
     # 输出统计信息
     typer.echo("\n" + "=" * 60)
@@ -321,11 +370,12 @@ def interactive(
     api_key: str | None = typer.Option(None, help="OpenAI API Key", envvar="OPENAI_API_KEY"),
     model: str | None = typer.Option(None, help="使用的模型名称", envvar="OPENAI_MODEL"),
     auto_approve: bool = typer.Option(True, help="是否自动批准工具调用"),
+    stream: bool = typer.Option(True, "--stream/--no-stream", help="流式打印回复，降低首 token 等待"),
 ):
     """交互式对话模式"""
 
     # 加载配置
-    settings = OpenAISettings()
+    settings = get_openai_settings()
     base_url = base_url or settings.base_url
     api_key = api_key or settings.api_key
     model = model or settings.model
@@ -343,6 +393,7 @@ def interactive(
         mcp_token=mcp_token,
         auto_approve=auto_approve,
         verbose=True,
+        stream=stream,
     )
 
     # 系统提示词
@@ -363,30 +414,35 @@ def interactive(
     typer.echo("\n输入 'exit' 或 'quit' 退出")
     typer.echo("=" * 60)
 
-    # 交互循环
-    is_first_query = True
-    while True:
-        try:
-            # 获取用户输入
-            query = typer.prompt("\n👤 你").strip()
+    # 所有轮次共用一个长生命周期事件循环: 每轮一个 asyncio.run 会关闭旧循环,
+    # 而 Agent 持有的 httpx 连接池还绑定在上面, 下一轮复用连接就会报 Event loop is closed;
+    # typer.prompt 留在主线程, Ctrl+C 才能直接打断 stdin 读取
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                # 获取用户输入
+                query = typer.prompt("\n👤 你").strip()
 
-            # 检查退出命令
-            if query.lower() in ["exit", "quit", "退出", "q"]:
-                typer.echo("\n👋 再见！")
-                break
+                # 检查退出命令
+                if query.lower() in ["exit", "quit", "退出", "q"]:
+                    typer.echo("\n👋 再见！")
+                    break
 
-            if not query:
-                continue
+                if not query:
+                    continue
 
-            # 运行对话
-            agent.run_conversation(query, system_prompt if is_first_query else None)
-            is_first_query = False
+                # 运行对话, system 前缀每轮保持一致以命中服务端 prompt 缓存
+                loop.run_until_complete(agent.run_conversation(query, system_prompt, previous_response_id=agent._last_response_id))
 
-        except KeyboardInterrupt:
-            typer.echo("\n\n👋 再见！")
-            break
-        except Exception as e:
-            typer.echo(f"\n❌ 错误: {str(e)}", err=True)
+            except (KeyboardInterrupt, typer.Abort):
+                typer.echo("\n\n👋 再见！")
+                break
+            except Exception as e:
+                typer.echo(f"\n❌ 错误: {str(e)}", err=True)
+    finally:
+        loop.run_until_complete(agent.client.close())
+        loop.close()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,14 @@
 import logging
+import os
+import selectors
 import subprocess
-import time
+import sys
+import threading
 from datetime import datetime
 from pathlib import Path
 
 import typer
-from watchfiles import Change
+from watchfiles import Change, DefaultFilter
 from watchfiles import watch as watch_changes
 
 from ai_assistant.commands import make_typer
@@ -17,6 +20,63 @@ helptext = """
 cmd = make_typer(helptext)
 
 
+def _echo_output_line(datestr: str, name: str, raw: bytes) -> None:
+    typer.echo(f"{datestr} [{name}] {raw.decode(errors='replace').rstrip()}")
+
+
+def _pump_stream_lines(stream, name: str, datestr: str) -> None:
+    """阻塞式逐行转发单个流, 供 Windows 线程回退路径使用"""
+    for raw in stream:
+        _echo_output_line(datestr, name, raw)
+
+
+def _stream_command(run_cmd: str, datestr: str) -> int:
+    """流式执行命令并逐行转发输出
+
+    长时间运行的命令边跑边出结果, 峰值内存只与单行长度相关,
+    不再把整个子进程输出缓冲成一个大字符串。
+    """
+    p = subprocess.Popen(run_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert p.stdout is not None and p.stderr is not None
+    streams = {p.stdout: "stdout", p.stderr: "stderr"}
+
+    if sys.platform == "win32":
+        # Windows 上 selectors 无法轮询管道, 退回每个流一个读取线程
+        threads = [threading.Thread(target=_pump_stream_lines, args=(stream, name, datestr), daemon=True) for stream, name in streams.items()]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        # 直接 os.read 原始 fd 并自行按行切分: 经过缓冲流的 readline 一次只吐一行,
+        # 余下内容滞留在缓冲区里, 而 fd 已不再可读, select 会一直等到子进程下次写入
+        sel = selectors.DefaultSelector()
+        buffers: dict[str, bytes] = {}
+        for stream, name in streams.items():
+            sel.register(stream, selectors.EVENT_READ, name)
+            buffers[name] = b""
+        open_streams = len(streams)
+        while open_streams:
+            for key, _ in sel.select():
+                name = key.data
+                chunk = os.read(key.fd, 65536)
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    open_streams -= 1
+                    if buffers[name]:
+                        _echo_output_line(datestr, name, buffers[name])
+                        buffers[name] = b""
+                    continue
+                *lines, buffers[name] = (buffers[name] + chunk).split(b"\n")
+                for raw in lines:
+                    _echo_output_line(datestr, name, raw)
+        sel.close()
+
+    returncode = p.wait()
+    typer.echo(f"{datestr} [exit_code] {returncode}")
+    return returncode
+
+
 @cmd.command()
 def watch(
     target: Path = typer.Argument(
@@ -29,7 +89,7 @@ def watch(
     ),
     run_cmd: str = typer.Argument(..., help="检测到变化后执行的 shell 命令"),
     interval: float = typer.Option(0.2, "-i", "--interval", help="事件轮询步长（秒）"),
-    debounce: float = typer.Option(0.5, "-d", "--debounce", help="两次触发的最短间隔（秒）"),
+    debounce: float = typer.Option(0.5, "-d", "--debounce", help="事件合并窗口（秒），一个窗口内的连续变化只触发一次"),
     run_on_start: bool = typer.Option(False, "--run-on-start", help="启动时先执行一次命令"),
 ):
     """监听文件变化并执行命令
@@ -53,49 +113,39 @@ def watch(
 
     watch_path = target if target.is_dir() else target.parent
     target_resolved = target.resolve()
+    target_str = str(target_resolved)
     target_is_dir = target.is_dir()
-    last_trigger_at = 0.0
+
+    # 过滤逻辑下沉到 watchfiles 的监听线程, 无关事件不再逐个进 Python 构造 Path 并 resolve
+    default_filter = DefaultFilter()
+
+    def related_filter(change: Change, path: str) -> bool:
+        return default_filter(change, path) and (target_is_dir or path == target_str)
 
     if run_on_start:
         datestr = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         typer.echo(f"{datestr} [startup] 执行命令: {run_cmd}")
-        p = subprocess.run(run_cmd, shell=True, check=False, capture_output=True, text=True)
-        typer.echo(f"{datestr} [exit_code] {p.returncode}")
-        typer.echo(f"{datestr} [stdout] {p.stdout}")
-        typer.echo(f"{datestr} [stderr] {p.stderr}")
-
-        last_trigger_at = time.time()
+        _stream_command(run_cmd, datestr)
 
     typer.echo(f"开始监听: {target}")
     typer.echo(f"触发命令: {run_cmd}")
     typer.echo("按 Ctrl+C 退出")
 
     try:
-        for changes in watch_changes(watch_path, recursive=True, debounce=0, step=int(interval * 1000)):
+        # 防抖交给 watchfiles 在 Rust 侧合并事件, 一个安静窗口只唤醒 Python 一次
+        for changes in watch_changes(watch_path, recursive=True, debounce=int(debounce * 1000), step=int(interval * 1000), watch_filter=related_filter):
             if not changes:
                 continue
 
-            if target_is_dir:
-                related_changes = changes
-            else:
-                related_changes = {(change, path) for change, path in changes if Path(path).resolve() == target_resolved}
-
-            if not related_changes:
-                continue
-
-            now = time.time()
-            if now - last_trigger_at < debounce:
-                continue
+            # vim 等编辑器原子保存会对同一路径发 delete+create 事件对, 按路径归并只保留最后一个
+            by_path: dict[str, Change] = {}
+            for change, path in changes:
+                by_path[path] = change
 
             datestr = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            action_names = sorted({change.name.lower() for change, _ in related_changes if isinstance(change, Change)})
+            action_names = sorted({change.name.lower() for change in by_path.values() if isinstance(change, Change)})
             typer.echo(f"{datestr} [changed] {target} ({', '.join(action_names)})")
-            p = subprocess.run(run_cmd, shell=True, check=False, capture_output=True, text=True)
-            typer.echo(f"{datestr} [exit_code] {p.returncode}")
-            typer.echo(f"{datestr} [stdout] {p.stdout}")
-            typer.echo(f"{datestr} [stderr] {p.stderr}")
-
-            last_trigger_at = now
+            _stream_command(run_cmd, datestr)
     except KeyboardInterrupt:
         typer.echo("\n已停止监听")
 
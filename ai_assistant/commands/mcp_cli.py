@@ -1,10 +1,16 @@
+from __future__ import annotations
+
 import json
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-import httpx
 import typer
 
 from ai_assistant.commands import make_typer
 
+if TYPE_CHECKING:
+    import httpx
+
 helptext = """
 MCP Client
 """
@@ -12,47 +18,67 @@ MCP Client
 cmd = make_typer(helptext)
 
 
+@lru_cache(maxsize=1)
+def get_client(http2: bool = True) -> httpx.Client:
+    """返回模块级共享的 httpx.Client, 复用连接池避免每次请求重新握手"""
+    import httpx
+
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(max_keepalive_connections=32),
+        transport=httpx.HTTPTransport(retries=2),
+    )
+
+
 @cmd.command()
 def tools(
     endpoint: str = typer.Argument(..., help="MCP 服务端点"),
+    http2: bool = typer.Option(True, "--http2/--no-http2", help="是否启用 HTTP/2"),
 ):
     """以 HTTP Post JSON-RPC 请求方式调用查询可用工具列表
 
     当前仅支持 streamable MCP 服务端点.
     """
+    # httpx 延迟到真正请求时再导入, 保持 CLI 启动轻量
+    import httpx
 
     # 构造 JSON-RPC 请求
     payload = {"jsonrpc": "2.0", "method": "tools/list", "params": {}, "id": 1}
 
     try:
-        # 发送 HTTP POST 请求
-        with httpx.Client() as client:
-            response = client.post(endpoint, json=payload, headers={"Content-Type": "application/json"}, timeout=30.0)
-            response.raise_for_status()
-
-            # 解析响应
-            result = response.json()
-
-            # 检查是否有错误
-            if "error" in result:
-                typer.echo(f"错误: {result['error']}", err=True)
-                raise typer.Exit(code=1)
-
-            # 获取工具列表
-            tools_list = result.get("result", {}).get("tools", [])
-
-            # 输出工具列表
-            if tools_list:
-                typer.echo(f"找到 {len(tools_list)} 个可用工具:\n")
-                for idx, tool in enumerate(tools_list, 1):
-                    typer.echo(f"{idx}. {tool.get('name', 'N/A')}")
-                    if description := tool.get("description"):
-                        typer.echo(f"   描述: {description}")
-                    if input_schema := tool.get("inputSchema"):
-                        typer.echo(f"   参数: {json.dumps(input_schema, ensure_ascii=False, indent=2)}")
-                    typer.echo()
-            else:
-                typer.echo("未找到可用工具")
+        # 发送 HTTP POST 请求, 客户端跨调用复用连接
+        client = get_client(http2)
+        response = client.post(
+            endpoint,
+            json=payload,
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            timeout=30.0,
+        )
+        response.raise_for_status()
+
+        # 解析响应, 只读取一次响应体
+        result = json.loads(response.read())
+
+        # 检查是否有错误
+        if "error" in result:
+            typer.echo(f"错误: {result['error']}", err=True)
+            raise typer.Exit(code=1)
+
+        # 获取工具列表
+        tools_list = result.get("result", {}).get("tools", [])
+
+        # 输出工具列表
+        if tools_list:
+            typer.echo(f"找到 {len(tools_list)} 个可用工具:\n")
+            for idx, tool in enumerate(tools_list, 1):
+                typer.echo(f"{idx}. {tool.get('name', 'N/A')}")
+                if description := tool.get("description"):
+                    typer.echo(f"   描述: {description}")
+                if input_schema := tool.get("inputSchema"):
+                    typer.echo(f"   参数: {json.dumps(input_schema, ensure_ascii=False, indent=2)}")
+                typer.echo()
+        else:
+            typer.echo("未找到可用工具")
 
     except httpx.HTTPError as e:
         typer.echo(f"HTTP 请求失败: {e}", err=True)
@@ -1,18 +1,30 @@
+from __future__ import annotations
+
 import asyncio
-import json
 import logging
 import random
+import shelve
 import time
 from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
+from xml.etree import ElementTree
 
-import httpx
+import orjson
 import typer
-from xmltodict import parse
 
 from ai_assistant.commands import make_typer
 
+if TYPE_CHECKING:
+    import httpx
+
 logger = logging.getLogger(__name__)
 RATE_LIMIT_CACHE: dict[str, float] = {}
+# netloc -> (上次请求/占位时间, 当前冷却秒数), 只有观察到限流的主机才被减速
+HOST_BACKOFF: dict[str, tuple[float, float]] = {}
+# url -> (etag, last_modified), 下一轮抓取时带上条件请求头, 未变化的源返回 304 空响应体
+ETAG_CACHE: dict[str, tuple[str | None, str | None]] = {}
+ETAG_CACHE_PATH = Path("~/.cache/ai_assistant/opml_etag.db").expanduser()
 
 helptext = """
 Fetch RSS feeds from OPML file periodically.
@@ -22,37 +34,49 @@ cmd = make_typer(helptext)
 
 
 def fetch_opml(path: Path) -> list[str]:
-    data = path.read_text(encoding="utf-8")
-    body = parse(data)
+    """流式解析 OPML, 逐个 outline 取 xmlUrl, 不构建整棵文档树"""
+    urllist = []
     try:
-        outline = body["opml"]["body"]["outline"]
-        urllist = []
-        for line in outline:
-            children = line.get("outline")
-            if children is None:
-                logger.debug(f"skip empty group: {line.get('@text', 'unknown')}")
+        for _, elem in ElementTree.iterparse(str(path), events=("end",)):
+            if elem.tag != "outline":
                 continue
-            if isinstance(children, list):
-                for item in children:
-                    url = item["@xmlUrl"]
-                    urllist.append(url)
-            elif isinstance(children, dict):
-                urllist.append(children["@xmlUrl"])
+            url = elem.get("xmlUrl")
+            if url:
+                urllist.append(url)
             else:
-                logger.error(f"opml file format error, line: {line}")
-    except KeyError:
+                logger.debug(f"skip empty group: {elem.get('text', 'unknown')}")
+            elem.clear()
+    except ElementTree.ParseError:
         raise ValueError("OPML 文件格式错误")
-    return urllist
+    # 按序去重并丢弃非 http(s) 链接, 合并过的 OPML 里重复的源只抓一次
+    return [url for url in dict.fromkeys(urllist) if url.startswith(("http://", "https://"))]
+
+
+def load_etag_cache(path: Path = ETAG_CACHE_PATH) -> None:
+    """从磁盘恢复条件请求缓存, 让 304 命中跨进程生效"""
+    try:
+        with shelve.open(str(path)) as db:
+            ETAG_CACHE.update(db)
+    except Exception:
+        logger.debug("load etag cache failed", exc_info=True)
+
+
+def save_etag_cache(path: Path = ETAG_CACHE_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with shelve.open(str(path)) as db:
+            db.update(ETAG_CACHE)
+    except Exception:
+        logger.debug("save etag cache failed", exc_info=True)
 
 
 async def fetch_rss(
     client: httpx.AsyncClient,
     url: str,
-    semaphore: asyncio.Semaphore,
     wait_time: int = 3,
     rate_limit_minutes: int = 10,
 ):
-    """异步获取 RSS，使用信号量控制并发"""
+    """异步获取单个 RSS, 并发度由调用方的 worker 池控制"""
     now = time.time()
     expires_at = RATE_LIMIT_CACHE.get(url)
     if expires_at is not None:
@@ -62,57 +86,93 @@ async def fetch_rss(
             return
         RATE_LIMIT_CACHE.pop(url, None)
 
-    async with semaphore:
-        try:
-            resp = await client.get(url, timeout=60)
-            if resp.status_code == 429:
-                expires_at = time.time() + rate_limit_minutes * 60
-                RATE_LIMIT_CACHE[url] = expires_at
-                logger.warning(f"fetch {url} failed, status code: 429, skip for next {rate_limit_minutes} minutes")
-                await asyncio.sleep(wait_time * 2)
+    headers = {}
+    etag, last_modified = ETAG_CACHE.get(url, (None, None))
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    # 只对观察到限流的主机限速: 冷却期内先等到下一个允许时刻, 正常主机全速抓取
+    host = urlparse(url).netloc
+    last_at, cooldown = HOST_BACKOFF.get(host, (0.0, 0.0))
+    if cooldown:
+        # 睡前先占位: 把下一个允许时刻写回 HOST_BACKOFF, 后续拿到同主机 URL 的
+        # worker 会基于占位时间再往后排, 不会在冷却结束的同一瞬间一起涌向限流主机
+        next_allowed_at = max(last_at + cooldown, time.time())
+        HOST_BACKOFF[host] = (next_allowed_at, cooldown)
+        delay = next_allowed_at - time.time()
+        if delay > 0:
+            logger.debug(f"host {host} in cooldown, wait {delay:.1f}s before fetch {url}")
+            await asyncio.sleep(delay)
+
+    try:
+        resp = await client.get(url, headers=headers)
+        if resp.status_code == 304:
+            logger.debug(f"skip {url}, not modified since last fetch (304)")
+            return
+        if resp.status_code == 429:
+            expires_at = time.time() + rate_limit_minutes * 60
+            RATE_LIMIT_CACHE[url] = expires_at
+            # 指数退避该主机, 上限 60 秒
+            cooldown = min(60.0, cooldown * 2) if cooldown else float(wait_time)
+            HOST_BACKOFF[host] = (time.time(), cooldown)
+            logger.warning(f"fetch {url} failed, status code: 429, skip for next {rate_limit_minutes} minutes, host cooldown {cooldown:.0f}s")
+            return
+        elif resp.status_code in (502, 530):
+            logger.debug(f"fetch {url} failed, status code: {resp.status_code}, maybe cloudflare tunnel is offline")
+            await asyncio.sleep(wait_time * 2)
+        elif resp.status_code in (403, 401):
+            logger.debug(f"fetch {url} failed, status code: {resp.status_code}, maybe the feed is protected")
+            await asyncio.sleep(wait_time * 2)
+        else:
+            resp.raise_for_status()
+            HOST_BACKOFF.pop(host, None)
+            ETAG_CACHE[url] = (resp.headers.get("etag"), resp.headers.get("last-modified"))
+            # orjson 直接解析原始字节, 省掉 bytes→str 解码和 stdlib json 的解析开销
+            content = await resp.aread()
+            try:
+                data = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                logger.warning(f"fetch {url} failed, json decode error, text content: {content.decode(errors='replace')}")
+                await asyncio.sleep(wait_time * 3)
                 return
-            elif resp.status_code in (502, 530):
-                logger.debug(f"fetch {url} failed, status code: {resp.status_code}, maybe cloudflare tunnel is offline")
-                await asyncio.sleep(wait_time * 2)
-            elif resp.status_code in (403, 401):
-                logger.debug(f"fetch {url} failed, status code: {resp.status_code}, maybe the feed is protected")
-                await asyncio.sleep(wait_time * 2)
-            else:
-                resp.raise_for_status()
-                try:
-                    data = resp.json()
-                except json.JSONDecodeError:
-                    logger.warning(f"fetch {url} failed, json decode error, text content: {resp.text}")
-                    await asyncio.sleep(wait_time * 3)
-                    return
-                title = data["title"]
-                homepage = data["home_page_url"]
-                logger.info(f"title: {title} - homepage: {homepage} - feedurl: {url}\n\n\n")
-                await asyncio.sleep(wait_time)
-        except Exception as e:
-            logging.error(f"fetch {url} failed, {e}", exc_info=True)
-            await asyncio.sleep(wait_time * 3)
+            title = data["title"]
+            homepage = data["home_page_url"]
+            logger.info(f"title: {title} - homepage: {homepage} - feedurl: {url}\n\n\n")
+    except Exception as e:
+        logging.error(f"fetch {url} failed, {e}", exc_info=True)
+        await asyncio.sleep(wait_time * 3)
 
 
 async def fetch_all_rss(
+    client: httpx.AsyncClient,
     urllist: list[str],
     max_concurrent: int = 5,
     rate_limit_minutes: int = 10,
 ):
-    """并发获取所有 RSS，最大并发数为 max_concurrent"""
-    semaphore = asyncio.Semaphore(max_concurrent)
+    """并发获取所有 RSS, 由 max_concurrent 个 worker 从队列消费
 
-    async with httpx.AsyncClient(verify=False, follow_redirects=True) as client:
-        tasks = [
-            fetch_rss(
-                client,
-                url,
-                semaphore,
-                rate_limit_minutes=rate_limit_minutes,
-            )
-            for url in urllist
-        ]
-        await asyncio.gather(*tasks)
+    固定数量的 worker 替代一条 URL 一个任务 + 信号量的写法, 避免一次性
+    创建数千个协程对象; 客户端由调用方传入, 连接可以跨轮次复用。
+    """
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for url in urllist:
+        queue.put_nowait(url)
+
+    async def worker(client: httpx.AsyncClient):
+        while True:
+            url = await queue.get()
+            try:
+                await fetch_rss(client, url, rate_limit_minutes=rate_limit_minutes)
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker(client)) for _ in range(max_concurrent)]
+    await queue.join()
+    for w in workers:
+        w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
 
 
 async def async_fetch(
@@ -121,21 +181,35 @@ async def async_fetch(
     loop: bool = False,
     rate_limit_minutes: int = 10,
 ):
-    while True:
-        urllist = fetch_opml(opml_path.expanduser())
-        current_time = time.time()
-        random.shuffle(urllist)
-        logger.info(f"开始新一轮抓取，共 {len(urllist)} 个 RSS 源，最大并发数: {max_concurrent}，429 跳过时长: {rate_limit_minutes} 分钟")
-        await fetch_all_rss(
-            urllist,
-            max_concurrent=max_concurrent,
-            rate_limit_minutes=rate_limit_minutes,
-        )
-        cost_time = time.time() - current_time
-        logger.info(f"本轮抓取完成，耗时 {cost_time:.2f} 秒\n")
-
-        if not loop:
-            break
+    # httpx 延迟到真正抓取时再导入, 保持 CLI 启动轻量
+    import httpx
+
+    load_etag_cache()
+    # 客户端提到循环外, 连接池跨轮次保持热连接, 循环抓取时不必每轮重新 TLS 握手
+    async with httpx.AsyncClient(
+        verify=False,
+        follow_redirects=True,
+        http2=True,
+        limits=httpx.Limits(max_connections=max_concurrent, max_keepalive_connections=max_concurrent),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+    ) as client:
+        while True:
+            urllist = fetch_opml(opml_path.expanduser())
+            current_time = time.time()
+            random.shuffle(urllist)
+            logger.info(f"开始新一轮抓取，共 {len(urllist)} 个 RSS 源，最大并发数: {max_concurrent}，429 跳过时长: {rate_limit_minutes} 分钟")
+            await fetch_all_rss(
+                client,
+                urllist,
+                max_concurrent=max_concurrent,
+                rate_limit_minutes=rate_limit_minutes,
+            )
+            cost_time = time.time() - current_time
+            logger.info(f"本轮抓取完成，耗时 {cost_time:.2f} 秒\n")
+            save_etag_cache()
+
+            if not loop:
+                break
 
 
 @cmd.command()
@@ -1,13 +1,16 @@
-import json
-from typing import cast
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, cast
 
 import typer
-from openai import OpenAI
-from openai.types.responses.response_output_message import ResponseOutputMessage
-from openai.types.responses.response_output_text import ResponseOutputText
 
 from ai_assistant.commands import make_typer
-from ai_assistant.settings import OpenAISettings
+
+if TYPE_CHECKING:
+    from ai_assistant.lib.semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
 
 helptext = """
 Generate N similar questions by input query.
@@ -16,7 +19,28 @@ Generate N similar questions by input query.
 cmd = make_typer(helptext)
 
 
-def get_similar_questions_by_query(query: str, topn: int, base_url: str, api_key: str, model: str) -> list[str] | None:
+def get_similar_questions_by_query(query: str, topn: int, base_url: str, api_key: str, model: str, cache: SemanticCache | None = None) -> list[str] | None:
+    # openai/pydantic 延迟到真正调用时再导入, 保持 CLI 启动轻量
+    from openai import OpenAI
+    from pydantic import BaseModel
+
+    class SimilarQs(BaseModel):
+        list: list[str]
+
+    # 语义缓存: 同义改写的重复提问只需一次本地 embedding, 不再走 LLM
+    # 缓存只是加速手段, 任何失败 (如离线环境下首次加载 embedding 模型需联网下载) 都降级为直连模型
+    cache_key = f"{model}:{topn}"
+    embedding = None
+    if cache is not None:
+        try:
+            embedding = cache.encode(query)
+            cached = cache.get(cache_key, embedding)
+            if cached is not None:
+                return cast("list[str]", cached[:topn])
+        except Exception:
+            logger.debug("semantic cache lookup failed, fall back to LLM", exc_info=True)
+            embedding = None
+
     client = OpenAI(base_url=base_url, api_key=api_key)
     prompt = f"""
     现在开始, 你是一位经验丰富的 AI 训练师, 负责帮我从一个问题泛化成至多{topn}条相似问.
@@ -28,18 +52,18 @@ def get_similar_questions_by_query(query: str, topn: int, base_url: str, api_key
         {"role": "user", "content": f"{query}"},
     ]
 
-    response = client.responses.create(model=model, input=messages)  # type: ignore
+    # 结构化输出约束模型一次就返回合法 JSON, 不再靠 try/except 扫描输出项
+    response = client.responses.parse(model=model, input=messages, text_format=SimilarQs)  # type: ignore
 
-    for item in response.output:
-        if isinstance(item, ResponseOutputMessage):
-            for content in item.content:
-                if isinstance(content, ResponseOutputText):
-                    try:
-                        data = json.loads(content.text)["list"]
-                        return cast(list[str], data[:topn])
-                    except json.decoder.JSONDecodeError:
-                        continue
-    return None
+    if response.output_parsed is None:
+        return None
+    result = cast("list[str]", response.output_parsed.list[:topn])
+    if cache is not None and embedding is not None:
+        try:
+            cache.put(cache_key, embedding, result)
+        except Exception:
+            logger.debug("semantic cache write failed", exc_info=True)
+    return result
 
 
 @cmd.command()
@@ -51,7 +75,10 @@ def generate(
     model: str | None = typer.Option(None),
 ):
     """输入问题并输出 N 条相似问题"""
-    settings = OpenAISettings()
+    from ai_assistant.lib.semantic_cache import load_semantic_cache
+    from ai_assistant.settings import get_openai_settings
+
+    settings = get_openai_settings()
     if base_url is None:
         base_url = settings.base_url
 
@@ -62,7 +89,8 @@ def generate(
         model = settings.model
 
     assert base_url and api_key and model
-    result = get_similar_questions_by_query(query, topn, base_url, api_key, model)
+    cache = load_semantic_cache(threshold=settings.semantic_cache_threshold, ttl=settings.semantic_cache_ttl)
+    result = get_similar_questions_by_query(query, topn, base_url, api_key, model, cache=cache)
     typer.echo("\n".join(result or []))
 
 
@@ -0,0 +1,129 @@
+"""基于句向量相似度的语义响应缓存。
+
+对同义改写的重复提问, 用一次本地 embedding 前向计算代替一次完整的 LLM 生成:
+命中时延迟通常下降 1~2 个数量级, 且不消耗 token。
+
+依赖可选项 ``sentence-transformers`` 与 ``numpy``, 未安装时由调用方降级为直连模型。
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_CACHE_PATH = Path("~/.cache/ai_assistant/similar_q.npz").expanduser()
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+
+@lru_cache(maxsize=1)
+def _default_encoder(model_name: str = DEFAULT_MODEL_NAME) -> Callable[[str], "np.ndarray"]:
+    """加载本地 embedding 模型, 进程内只加载一次"""
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+
+    def encode(text: str) -> "np.ndarray":
+        return np.asarray(model.encode([text], normalize_embeddings=True)[0])
+
+    return encode
+
+
+class SemanticCache:
+    """embedding 相似度缓存: 列式存储 (N, dim) 向量矩阵与平行的响应列表
+
+    查询时对矩阵做一次点积取最近邻, 相似度达到阈值且未过期即命中。
+    key 用于区分 (model, topn) 等上下文, 避免跨模型串结果。
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        threshold: float = 0.92,
+        ttl: float = 86400,
+        encode: Callable[[str], "np.ndarray"] | None = None,
+    ):
+        import numpy as np
+
+        self._np = np
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self._encode = encode
+        self._embeddings = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        self._keys: list[str] = []
+        self._responses: list[str] = []
+        self._timestamps: list[float] = []
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = self._np.load(self.path, allow_pickle=False)
+            self._embeddings = data["embeddings"].astype(self._np.float32)
+            self._keys = [str(x) for x in data["keys"]]
+            self._responses = [str(x) for x in data["responses"]]
+            self._timestamps = [float(x) for x in data["timestamps"]]
+        except Exception:
+            # 缓存文件损坏时直接丢弃, 下次写入会重建
+            self._embeddings = self._np.empty((0, EMBEDDING_DIM), dtype=self._np.float32)
+            self._keys, self._responses, self._timestamps = [], [], []
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._np.savez(
+            self.path,
+            embeddings=self._embeddings,
+            keys=self._np.array(self._keys),
+            responses=self._np.array(self._responses),
+            timestamps=self._np.array(self._timestamps),
+        )
+
+    def encode(self, query: str) -> "np.ndarray":
+        if self._encode is None:
+            self._encode = _default_encoder()
+        return self._np.asarray(self._encode(query), dtype=self._np.float32)
+
+    def get(self, key: str, embedding: "np.ndarray"):
+        """返回最近邻且达到阈值的缓存响应, 未命中返回 None"""
+        if not len(self._keys):
+            return None
+        now = time.time()
+        valid = self._np.array([k == key and now - ts <= self.ttl for k, ts in zip(self._keys, self._timestamps)])
+        if not valid.any():
+            return None
+        sims = self._embeddings @ embedding
+        sims = self._np.where(valid, sims, -1.0)
+        idx = int(sims.argmax())
+        if sims[idx] < self.threshold:
+            return None
+        return json.loads(self._responses[idx])
+
+    def put(self, key: str, embedding: "np.ndarray", response) -> None:
+        self._embeddings = self._np.vstack([self._embeddings, embedding[None, :].astype(self._np.float32)])
+        self._keys.append(key)
+        self._responses.append(json.dumps(response, ensure_ascii=False))
+        self._timestamps.append(time.time())
+        self._save()
+
+
+def load_semantic_cache(
+    threshold: float = 0.92,
+    ttl: float = 86400,
+    path: Path = DEFAULT_CACHE_PATH,
+) -> SemanticCache | None:
+    """可选依赖齐备时返回缓存实例, 否则返回 None 由调用方降级"""
+    try:
+        import numpy  # noqa: F401
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        return None
+    return SemanticCache(path=path, threshold=threshold, ttl=ttl)
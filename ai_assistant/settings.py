@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,7 +8,15 @@ class OpenAISettings(BaseSettings):
     base_url: str | None = None
     model: str | None = "gpt-5.4"
     temperature: float = 0
-    model_config = SettingsConfigDict(env_prefix="openai_", extra="ignore", env_file=".env")
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_ttl: float = 86400
+    model_config = SettingsConfigDict(env_prefix="openai_", extra="ignore", env_file=".env", env_file_encoding="utf-8")
+
+
+@lru_cache(maxsize=1)
+def get_openai_settings() -> OpenAISettings:
+    """进程内复用同一份 OpenAI 配置, 避免每次调用都重读 .env 并重新校验"""
+    return OpenAISettings()
 
 
 class CloudflareSettings(BaseSettings):
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import pytest
+
+from ai_assistant.commands.opml import fetch_opml
+
+NESTED_OPML = """<?xml version="1.0" encoding="UTF-8"?>
+<opml version="2.0">
+  <head><title>feeds</title></head>
+  <body>
+    <outline text="技术">
+      <outline text="博客A" type="rss" xmlUrl="https://a.example.com/feed.json"/>
+      <outline text="博客B" type="rss" xmlUrl="https://b.example.com/feed.json"/>
+    </outline>
+    <outline text="空分组"/>
+    <outline text="资讯">
+      <outline text="博客C" type="rss" xmlUrl="https://c.example.com/feed.json"/>
+    </outline>
+  </body>
+</opml>
+"""
+
+
+def _write_opml(tmp_path: Path, content: str) -> Path:
+    path = tmp_path / "feeds.opml"
+    path.write_text(content, encoding="utf-8")
+    return path
+
+
+def test_fetch_opml_collects_nested_feed_urls(tmp_path: Path):
+    path = _write_opml(tmp_path, NESTED_OPML)
+    assert fetch_opml(path) == [
+        "https://a.example.com/feed.json",
+        "https://b.example.com/feed.json",
+        "https://c.example.com/feed.json",
+    ]
+
+
+def test_fetch_opml_collects_top_level_feed_urls(tmp_path: Path):
+    content = """<?xml version="1.0"?>
+<opml version="2.0">
+  <body>
+    <outline text="博客A" type="rss" xmlUrl="https://a.example.com/feed.json"/>
+  </body>
+</opml>
+"""
+    path = _write_opml(tmp_path, content)
+    assert fetch_opml(path) == ["https://a.example.com/feed.json"]
+
+
+def test_fetch_opml_dedupes_and_drops_non_http_urls(tmp_path: Path):
+    content = """<?xml version="1.0"?>
+<opml version="2.0">
+  <body>
+    <outline text="博客A" xmlUrl="https://a.example.com/feed.json"/>
+    <outline text="博客A备份" xmlUrl="https://a.example.com/feed.json"/>
+    <outline text="博客B" xmlUrl="http://b.example.com/feed.json"/>
+    <outline text="本地" xmlUrl="file:///tmp/feed.json"/>
+  </body>
+</opml>
+"""
+    path = _write_opml(tmp_path, content)
+    assert fetch_opml(path) == [
+        "https://a.example.com/feed.json",
+        "http://b.example.com/feed.json",
+    ]
+
+
+def test_fetch_opml_raises_on_invalid_xml(tmp_path: Path):
+    path = _write_opml(tmp_path, "<opml><body>")
+    with pytest.raises(ValueError):
+        fetch_opml(path)
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai_assistant.lib.semantic_cache import EMBEDDING_DIM, SemanticCache  # noqa: E402
+
+
+def _encoder(mapping: dict[str, int]):
+    """把每个问题映射到一个 one-hot 向量, 相同下标即完全相似"""
+
+    def encode(text: str):
+        vec = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        vec[mapping[text]] = 1.0
+        return vec
+
+    return encode
+
+
+def _make_cache(tmp_path: Path, mapping: dict[str, int], **kwargs) -> SemanticCache:
+    return SemanticCache(path=tmp_path / "similar_q.npz", encode=_encoder(mapping), **kwargs)
+
+
+def test_put_then_get_returns_cached_response(tmp_path: Path):
+    cache = _make_cache(tmp_path, {"问题A": 0})
+    emb = cache.encode("问题A")
+    assert cache.get("gpt:5", emb) is None
+
+    cache.put("gpt:5", emb, ["相似问1", "相似问2"])
+    assert cache.get("gpt:5", emb) == ["相似问1", "相似问2"]
+
+
+def test_get_misses_below_threshold(tmp_path: Path):
+    cache = _make_cache(tmp_path, {"问题A": 0, "问题B": 1}, threshold=0.92)
+    cache.put("gpt:5", cache.encode("问题A"), ["相似问"])
+    assert cache.get("gpt:5", cache.encode("问题B")) is None
+
+
+def test_get_isolates_cache_keys(tmp_path: Path):
+    cache = _make_cache(tmp_path, {"问题A": 0})
+    emb = cache.encode("问题A")
+    cache.put("gpt-4:5", emb, ["相似问"])
+    assert cache.get("gpt-4:3", emb) is None
+    assert cache.get("其他模型:5", emb) is None
+
+
+def test_get_expires_by_ttl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cache = _make_cache(tmp_path, {"问题A": 0}, ttl=60)
+    emb = cache.encode("问题A")
+    cache.put("gpt:5", emb, ["相似问"])
+
+    import time
+
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 10**9)
+    assert cache.get("gpt:5", emb) is None
+
+
+def test_cache_persists_across_instances(tmp_path: Path):
+    mapping = {"问题A": 0}
+    cache = _make_cache(tmp_path, mapping)
+    emb = cache.encode("问题A")
+    cache.put("gpt:5", emb, ["相似问1", "相似问2"])
+
+    reloaded = _make_cache(tmp_path, mapping)
+    assert reloaded.get("gpt:5", emb) == ["相似问1", "相似问2"]